@@ -5,14 +5,23 @@ It leverages NLP and rule-based logic for robust category suggestions—vital fo
 - Extensible for privacy and local fine-tuning.
 """
 
+import os
 import re
 import json
+import html
+import functools
+import threading
 import streamlit as st
 from collections import defaultdict
 from pathlib import Path
 
+try:
+    import ahocorasick  # pyahocorasick: single-pass multi-keyword matching
+except ImportError:
+    ahocorasick = None
+
 # ---- CATEGORY DATA ----
-CATEGORY_DATA = [
+DEFAULT_CATEGORY_DATA = [
     {"name": "Food & Dining", "emoji": "🍛", "keywords": [
         "restaurant", "food", "lunch", "dinner", "breakfast", "snacks", "cafe", "pizza", "groceries", "meal", "coffee", "tea", "swiggy", "zomato", "ubereats", "grocery", "milk", "eggs", "vegetable", "fruit"
     ]},
@@ -53,9 +62,21 @@ CATEGORY_DATA = [
 
 # For real-life extensibility: allowing category config from a JSON file
 CATEGORY_CONFIG_FILE = Path("ai/categories.json")
+
+@st.cache_resource
+def _load_category_data(path, mtime):
+    """
+    Parse the category config file once per file version.
+    mtime is only part of the cache key, so an edited file is re-read.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 if CATEGORY_CONFIG_FILE.exists():
-    with open(CATEGORY_CONFIG_FILE, "r", encoding="utf-8") as f:
-        CATEGORY_DATA = json.load(f)
+    CATEGORY_DATA = _load_category_data(str(CATEGORY_CONFIG_FILE), CATEGORY_CONFIG_FILE.stat().st_mtime)
+else:
+    # Copy, so categories added at runtime don't leak into the built-in defaults
+    CATEGORY_DATA = list(DEFAULT_CATEGORY_DATA)
 
 CATEGORY_KEYWORDS = defaultdict(list)
 for cat in CATEGORY_DATA:
@@ -63,6 +84,103 @@ for cat in CATEGORY_DATA:
         CATEGORY_KEYWORDS[kw.lower()].append(cat["name"])
 
 CATEGORY_NAMES = [cat["name"] for cat in CATEGORY_DATA]
+# First entry wins for duplicate names, matching add_custom_category
+CATEGORY_INDEX = {}
+CATEGORY_EMOJI = {}
+for i, cat in enumerate(CATEGORY_DATA):
+    CATEGORY_INDEX.setdefault(cat["name"], i)
+    CATEGORY_EMOJI.setdefault(cat["name"], cat["emoji"])
+
+# Bumped whenever categories change, so cached suggestions are invalidated
+_cat_version = 0
+
+# Streamlit serves sessions on separate threads; serializes custom-category updates and file writes
+_CATEGORY_LOCK = threading.Lock()
+
+# Context words and amounts, classified in a single regex pass via named groups
+_HEURISTIC_RE = re.compile(
+    r"\b(?P<edu>tuition|school|education|student|exam|fees|college)\b"
+    r"|\b(?P<home>rent|maintenance|society|home)\b"
+    r"|\b(?P<amt>\d{2,8})\b"
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+def _split_keywords():
+    """
+    Split CATEGORY_KEYWORDS into single-word keywords (matched as whole words via set lookup)
+    and phrases such as "mutual fund" (matched as substrings).
+    """
+    single, multi = {}, {}
+    for kw, cats in CATEGORY_KEYWORDS.items():
+        (single if _WORD_RE.fullmatch(kw) else multi)[kw] = cats
+    return single, multi
+
+_SINGLE_KW, _MULTI_KW = _split_keywords()
+
+# Plural endings a single-word keyword may carry ("bills", "taxis", "buses")
+_PLURAL_SUFFIXES = ("s", "es")
+
+def _single_kw_forms(word):
+    """Yield the word itself plus its stems with a plural "s"/"es" removed."""
+    yield word
+    for suffix in _PLURAL_SUFFIXES:
+        if word.endswith(suffix) and len(word) > len(suffix):
+            yield word[:-len(suffix)]
+
+def _is_keyword_word(text_l, start, end):
+    """
+    True if text_l[start:end] starts a word and the word ends there or continues only
+    with a plural "s"/"es", so "bill" matches "bills" but "fun" does not match "refund".
+    """
+    if start > 0 and _WORD_RE.match(text_l, start - 1, start):
+        return False
+    rest = _WORD_RE.match(text_l, end)
+    return rest is None or rest.group() in _PLURAL_SUFFIXES
+
+def _build_keyword_automaton():
+    """
+    Build an Aho-Corasick automaton over all category keywords.
+    Returns None if pyahocorasick is not installed (pure-Python scan is used instead).
+    """
+    if ahocorasick is None or not CATEGORY_KEYWORDS:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw, cats in CATEGORY_KEYWORDS.items():
+        automaton.add_word(kw, (kw, cats))
+    automaton.make_automaton()
+    return automaton
+
+KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+def _iter_keyword_matches(text_l):
+    """
+    Yield (keyword, categories) for every keyword contained in the lowercased text.
+    Single-word keywords must appear as whole words, optionally pluralized with "s"/"es"
+    ("bought vegetables and fruits" matches vegetable and fruit, "paid electricity bills"
+    matches electricity and bill, but "refund" does not match fun); phrases may appear anywhere.
+    Each keyword is reported once, no matter how often it occurs.
+    """
+    if KEYWORD_AUTOMATON is None:
+        # Tokenize once: single words become dict lookups, only phrases need a substring scan
+        seen = set()
+        for word in dict.fromkeys(_WORD_RE.findall(text_l)):
+            for form in _single_kw_forms(word):
+                if form in _SINGLE_KW and form not in seen:
+                    seen.add(form)
+                    yield form, _SINGLE_KW[form]
+        for kw, cats in _MULTI_KW.items():
+            if kw in text_l:
+                yield kw, cats
+        return
+    seen = set()
+    for end_idx, (kw, cats) in KEYWORD_AUTOMATON.iter(text_l):
+        if kw in seen:
+            continue
+        if kw in _SINGLE_KW and not _is_keyword_word(text_l, end_idx - len(kw) + 1, end_idx + 1):
+            continue
+        seen.add(kw)
+        yield kw, cats
 
 # ---- MAIN CATEGORY LOGIC ----
 
@@ -71,54 +189,72 @@ def suggest_categories(text, top_n=3):
     Suggest top_n categories for an expense based on its description/text.
     Returns a list of (category, score, emoji, explanation) tuples.
     """
+    # Scoring is case-insensitive and ignores surrounding whitespace, so normalize the cache key
+    return list(_suggest_cached(text.lower().strip(), top_n, _cat_version))
+
+@functools.lru_cache(maxsize=512)
+def _suggest_cached(text, top_n, cat_version):
+    """
+    Cached scoring behind suggest_categories (Streamlit reruns repeat the same text).
+    cat_version is only part of the cache key; it changes when categories are added.
+    """
     text_l = text.lower()
     scores = defaultdict(int)
     matched_keywords = defaultdict(list)
-    for kw, cats in CATEGORY_KEYWORDS.items():
-        if kw in text_l:
-            for cat in cats:
-                scores[cat] += 3  # Strong keyword match
-                matched_keywords[cat].append(kw)
-    # Fuzzy/heuristic scoring: number detection, context words
-    if re.search(r"\b(tuition|school|education|student|exam|fees|college)\b", text_l):
+    for kw, cats in _iter_keyword_matches(text_l):
+        for cat in cats:
+            scores[cat] += 3  # Strong keyword match
+            matched_keywords[cat].append(kw)
+    # Fuzzy/heuristic scoring: number detection, context words (first match per group)
+    heuristics = {}
+    for m in _HEURISTIC_RE.finditer(text_l):
+        heuristics.setdefault(m.lastgroup, m.group())
+    if "edu" in heuristics:
         scores["Children & Education"] += 2
-    if re.search(r"\b(rent|maintenance|society|home)\b", text_l):
+    if "home" in heuristics:
         scores["Home & Rent"] += 2
     # Special: Category by amount (large amount for rent/investment)
-    try:
-        amt = float(re.search(r"\b\d{2,8}\b", text_l).group())
-        if amt > 5000:
-            scores["Home & Rent"] += 1
-            scores["Investment & Savings"] += 1
-    except Exception:
-        pass
+    if "amt" in heuristics and int(heuristics["amt"]) > 5000:
+        scores["Home & Rent"] += 1
+        scores["Investment & Savings"] += 1
     # Fallback: If no strong match, suggest "Other"
     if not scores:
         scores["Other"] = 1
     # Ranking
-    ranked = sorted(scores.items(), key=lambda x: (-x[1], CATEGORY_NAMES.index(x[0])))
+    ranked = sorted(scores.items(), key=lambda x: (-x[1], CATEGORY_INDEX.get(x[0], len(CATEGORY_INDEX))))
     out = []
     for cat, score, in ranked[:top_n]:
-        emoji = next((c["emoji"] for c in CATEGORY_DATA if c["name"] == cat), "")
+        emoji = CATEGORY_EMOJI.get(cat, "")
         explanation = f"Matched keywords: {', '.join(matched_keywords[cat])}" if matched_keywords[cat] else "No strong keyword match."
         out.append((cat, score, emoji, explanation))
-    return out
+    return tuple(out)
 
 def add_custom_category(name, emoji="🔖", keywords=None):
     """
     Allow user to add a custom category at runtime.
     """
+    global KEYWORD_AUTOMATON, _SINGLE_KW, _MULTI_KW, _cat_version
     new_cat = {
         "name": name,
         "emoji": emoji,
         "keywords": keywords or []
     }
-    CATEGORY_DATA.append(new_cat)
-    for kw in new_cat["keywords"]:
-        CATEGORY_KEYWORDS[kw.lower()].append(name)
-    CATEGORY_NAMES.append(name)
-    with open(CATEGORY_CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(CATEGORY_DATA, f, ensure_ascii=False, indent=2)
+    with _CATEGORY_LOCK:
+        CATEGORY_DATA.append(new_cat)
+        for kw in new_cat["keywords"]:
+            CATEGORY_KEYWORDS[kw.lower()].append(name)
+        CATEGORY_NAMES.append(name)
+        CATEGORY_INDEX.setdefault(name, len(CATEGORY_NAMES) - 1)
+        CATEGORY_EMOJI.setdefault(name, emoji)
+        _SINGLE_KW, _MULTI_KW = _split_keywords()
+        KEYWORD_AUTOMATON = _build_keyword_automaton()
+        _cat_version += 1
+        # Write to a temp file and swap it in, so a crash never leaves a half-written config
+        tmp_file = CATEGORY_CONFIG_FILE.with_name(CATEGORY_CONFIG_FILE.name + ".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(CATEGORY_DATA, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CATEGORY_CONFIG_FILE)
+        _load_category_data.clear()
 
 def category_ui(text, allow_custom=True, show_emoji=True):
     """
@@ -170,14 +306,18 @@ def category_ui(text, allow_custom=True, show_emoji=True):
         return None
 
     # Show suggestions as colored category pills with emoji and explanation
+    # (all pills in one markdown block; only the buttons need their own widgets)
     st.markdown("**AI suggestions:**")
+    pills = "".join(
+        f'<div><span class="category-pill">{html.escape(emoji) if show_emoji else ""} {html.escape(cat)}</span>'
+        f'<br/><small><i>{html.escape(expl)}</i></small></div>'
+        for cat, score, emoji, expl in suggestions
+    )
+    st.markdown(f"<div style='display:flex;gap:1em'>{pills}</div>", unsafe_allow_html=True)
     cols = st.columns(len(suggestions))
     selection = None
     for i, (cat, score, emoji, expl) in enumerate(suggestions):
         with cols[i]:
-            pill = f'<span class="category-pill">{emoji if show_emoji else ""} {cat}</span>'
-            st.markdown(pill, unsafe_allow_html=True)
-            st.caption(f"_{expl}_")
             if st.button(f"Select '{cat}'", key=f"sel_{cat}"):
                 selection = cat
 
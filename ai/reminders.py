@@ -1,25 +1,44 @@
 import os
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import pytz
 import requests
-import json
 import streamlit as st
+from google.cloud.firestore import SERVER_TIMESTAMP
 
 # Default timezone for reminders
 DEFAULT_TIMEZONE = "Asia/Kolkata"
+_TZ = pytz.timezone(DEFAULT_TIMEZONE)
+
+# Number of users whose reminders are processed concurrently (work is network-bound)
+REMINDER_WORKERS = 16
+
+# Firestore allows at most 500 writes per batch
+MAX_BATCH_WRITES = 500
 
 # Fetch FCM server key securely from environment variable for push notifications
 FCM_SERVER_KEY = os.environ.get("FCM_SERVER_KEY")
 
+# Shared HTTP session so FCM pushes reuse keep-alive connections instead of a new TLS handshake each
+_FCM_SESSION = requests.Session()
+_FCM_SESSION.headers.update({"Content-Type": "application/json"})
+_FCM_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
 
 def get_local_now():
     """Get the current time in the default timezone."""
-    return datetime.now(pytz.timezone(DEFAULT_TIMEZONE))
+    return datetime.now(_TZ)
 
 
-def parse_remind_dt(dt_str):
-    """Parse ISO datetime string to a datetime object with timezone."""
-    return datetime.fromisoformat(dt_str).astimezone(pytz.timezone(DEFAULT_TIMEZONE))
+def parse_remind_dt(remind_dt):
+    """
+    Convert a stored reminder time to a datetime in the default timezone.
+    Firestore returns native timestamps as datetimes; older reminders hold ISO strings.
+    """
+    if not isinstance(remind_dt, datetime):
+        remind_dt = datetime.fromisoformat(remind_dt)
+    return remind_dt.astimezone(_TZ)
 
 
 def get_reminders(db, user_id):
@@ -49,10 +68,11 @@ def add_reminder(db, user_id, message, remind_dt):
         message: Reminder message
         remind_dt: Datetime object for when to send reminder
     """
+    # Native Firestore timestamps: compared by time in queries, created_at set by the server
     db.collection("users").document(user_id).collection("reminders").add({
         "message": message,
-        "remind_dt": remind_dt.isoformat(),
-        "created_at": datetime.utcnow().isoformat(),
+        "remind_dt": remind_dt,
+        "created_at": SERVER_TIMESTAMP,
         "sent": False,
     })
 
@@ -93,10 +113,7 @@ def send_fcm_push(token, title, body):
         print("FCM_SERVER_KEY not set in environment!")
         return 401, "FCM server key missing"
     url = "https://fcm.googleapis.com/fcm/send"
-    headers = {
-        "Authorization": f"key={FCM_SERVER_KEY}",
-        "Content-Type": "application/json"
-    }
+    headers = {"Authorization": f"key={FCM_SERVER_KEY}"}
     payload = {
         "to": token,
         "notification": {
@@ -105,7 +122,7 @@ def send_fcm_push(token, title, body):
             "icon": "https://app.com/icon.png" 
         }
     }
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+    response = _FCM_SESSION.post(url, headers=headers, json=payload)
     return response.status_code, response.text
 
 
@@ -113,33 +130,69 @@ def process_due_reminders(db):
     """
     Check all users' reminders and send push notifications for due ones.
     Should be run periodically (e.g., every minute) in a background job or cloud function.
+    Needs the composite index (sent ASC, remind_dt ASC) from firestore.indexes.json.
     Args:
         db: Firestore client
     """
     users = db.collection("users").stream()
     now = get_local_now()
-    for user_doc in users:
+
+    def _handle_user(user_doc):
         user_id = user_doc.id
         user_data = user_doc.to_dict()
         token = user_data.get("fcm_token")
         if not token:
-            continue  # Skip users who haven't registered for push notifications
-        reminders = db.collection("users").document(user_id).collection("reminders") \
-            .where("sent", "==", False).stream()
-        for rem in reminders:
-            data = rem.to_dict()
-            rem_dt = parse_remind_dt(data["remind_dt"])
-            # If reminder is due (now or past), and not already sent
-            if rem_dt <= now and not data.get("sent"):
-                # Send push notification
-                status, resp = send_fcm_push(
-                    token,
-                    "⏰ Reminder from Budgetlytic",
-                    data["message"]
-                )
-                # Mark as sent if successfully delivered
-                if status == 200:
-                    rem.reference.update({"sent": True})
+            return  # Skip users who haven't registered for push notifications
+        unsent = db.collection("users").document(user_id).collection("reminders") \
+            .where("sent", "==", False)
+        # Only due timestamp reminders are returned; future ones stay on the server.
+        # Older reminders store remind_dt as an ISO string, which a timestamp filter never
+        # matches (Firestore compares by type first), so those are fetched separately, checked
+        # against now below and rewritten as timestamps. Delete the second query (and the rewrite)
+        # once no unsent reminder with a string remind_dt is left; users without an fcm_token are
+        # skipped here, so theirs are only migrated after they register.
+        reminders = chain(
+            unsent.where("remind_dt", "<=", now).stream(),
+            unsent.where("remind_dt", ">=", "").stream(),
+        )
+        # Sent-marks are collected and committed together instead of one update RPC each
+        batch = db.batch()
+        pending = 0
+        try:
+            for rem in reminders:
+                data = rem.to_dict()
+                rem_dt = parse_remind_dt(data["remind_dt"])
+                updates = {}
+                if isinstance(data["remind_dt"], str):
+                    # Migrate to a native timestamp so later runs find it with the first query
+                    updates["remind_dt"] = rem_dt
+                # If reminder is due (now or past), and not already sent
+                if rem_dt <= now and not data.get("sent"):
+                    # Send push notification
+                    status, resp = send_fcm_push(
+                        token,
+                        "⏰ Reminder from Budgetlytic",
+                        data["message"]
+                    )
+                    # Mark as sent if successfully delivered
+                    if status == 200:
+                        updates["sent"] = True
+                if updates:
+                    batch.update(rem.reference, updates)
+                    pending += 1
+                    if pending == MAX_BATCH_WRITES:
+                        batch.commit()
+                        batch = db.batch()
+                        pending = 0
+        finally:
+            # Even if a later push raises, reminders already delivered must be marked sent
+            if pending:
+                batch.commit()
+
+    # Users are independent, so their Firestore queries and FCM pushes can overlap.
+    # The Firestore client and the FCM session are both safe to share across threads.
+    with ThreadPoolExecutor(max_workers=REMINDER_WORKERS) as executor:
+        list(executor.map(_handle_user, users))
 
 
 def reminders_ui(db, user_id, fcm_token=None):
@@ -158,26 +211,29 @@ def reminders_ui(db, user_id, fcm_token=None):
         store_fcm_token(db, user_id, fcm_token)
         st.success("Push notifications enabled for your device!")
 
+    now = get_local_now()
+
     # --- Reminder creation form ---
     with st.form("add_reminder_form", clear_on_submit=True):
         message = st.text_input("Reminder message", placeholder="E.g. Pay electricity bill, Transfer to savings...")
-        date = st.date_input("Date", min_value=get_local_now().date())
-        time = st.time_input("Time", value=(get_local_now() + timedelta(minutes=2)).time())
+        date = st.date_input("Date", min_value=now.date())
+        time = st.time_input("Time", value=(now + timedelta(minutes=2)).time())
         submitted = st.form_submit_button("Add Reminder")
         if submitted:
             remind_dt = datetime.combine(date, time)
-            remind_dt = pytz.timezone(DEFAULT_TIMEZONE).localize(remind_dt)
+            remind_dt = _TZ.localize(remind_dt)
             add_reminder(db, user_id, message, remind_dt)
             st.success("Reminder set!")
 
     # --- List all upcoming reminders ---
     reminders = get_reminders(db, user_id)
     st.markdown("### Upcoming Reminders")
-    upcoming = [r for r in reminders if parse_remind_dt(r["remind_dt"]) >= get_local_now()]
-    upcoming = sorted(upcoming, key=lambda r: r["remind_dt"])
+    # Parse each reminder time once and reuse it for filtering, sorting and display
+    decorated = [(parse_remind_dt(r["remind_dt"]), r) for r in reminders]
+    upcoming = [(rem_dt, r) for rem_dt, r in decorated if rem_dt >= now]
+    upcoming.sort(key=lambda x: x[0])
     if upcoming:
-        for r in upcoming:
-            rem_dt = parse_remind_dt(r["remind_dt"])
+        for rem_dt, r in upcoming:
             st.markdown(f"- **{rem_dt.strftime('%a, %d %b %Y %H:%M')}**: {r['message']}")
             if st.button(f"Delete", key=f"del_{r['id']}"):
                 delete_reminder(db, user_id, r["id"])
@@ -0,0 +1,78 @@
+"""
+clients.py
+
+Shared service clients for the Streamlit app (app/main.py) and the Flask API (app/routes.py).
+Each client is created on first use and then reused for the life of the process, so running
+both entry points together initializes Firebase, Cloudinary and Whisper only once.
+The Google Cloud Vision client is shared the same way by ocr.photo_ocr.get_client.
+"""
+
+import os
+import threading
+import cloudinary
+import firebase_admin
+from firebase_admin import credentials, firestore, initialize_app
+
+_cloudinary_lock = threading.Lock()
+_cloudinary_configured = False
+
+_db_lock = threading.Lock()
+_db = None
+
+_whisper_lock = threading.Lock()
+_whisper_model = None
+
+
+def configure_cloudinary():
+    """Apply Cloudinary credentials from the environment (once per process)."""
+    global _cloudinary_configured
+    with _cloudinary_lock:
+        if not _cloudinary_configured:
+            cloudinary.config(
+                cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
+                api_key=os.environ.get("CLOUDINARY_API_KEY"),
+                api_secret=os.environ.get("CLOUDINARY_API_SECRET")
+            )
+            _cloudinary_configured = True
+
+
+def get_db():
+    """
+    Return the shared Firestore client, initializing the Firebase app if needed.
+
+    Returns:
+        google.cloud.firestore.Client: Firestore client reused across calls.
+    """
+    global _db
+    with _db_lock:
+        if _db is None:
+            if not firebase_admin._apps:
+                cred_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "serviceAccountKey.json")
+                initialize_app(credentials.Certificate(cred_path))
+            _db = firestore.client()
+        return _db
+
+
+def get_whisper_model():
+    """
+    Return the shared Whisper model, loading it on first use.
+    CTranslate2 backend: FP16 on GPU, int8 quantized weights on CPU (all but one core on
+    hosts with more than 4, otherwise CTranslate2's default of 4 threads capped at the core count).
+
+    Returns:
+        faster_whisper.WhisperModel: The "base" Whisper model.
+    """
+    global _whisper_model
+    with _whisper_lock:
+        if _whisper_model is None:
+            # Imported here so the Firestore/Cloudinary getters don't pull in the speech stack
+            import ctranslate2
+            from faster_whisper import WhisperModel
+            if ctranslate2.get_cuda_device_count() > 0:
+                _whisper_model = WhisperModel("base", device="cuda", compute_type="float16")
+            else:
+                cores = os.cpu_count() or 1
+                _whisper_model = WhisperModel(
+                    "base", device="cpu", compute_type="int8", cpu_threads=min(cores, max(4, cores - 1))
+                )
+        return _whisper_model
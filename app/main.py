@@ -1,46 +1,28 @@
 import streamlit as st
 from dotenv import load_dotenv
-import os
-import cloudinary
 import cloudinary.uploader
-from firebase_admin import credentials, firestore, initialize_app
-import whisper
+from firebase_admin import firestore
 from PIL import Image
 import io
-from google.cloud import vision
 import pytz
 from datetime import datetime
 import base64
-import re
+from collections import Counter
+import pandas as pd
 
 # ---- LOAD ENVIRONMENT ----
 load_dotenv()
 
-# ---- CLOUDINARY SETUP ----
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.environ.get("CLOUDINARY_API_KEY"),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET")
-)
-
-# ---- FIRESTORE SETUP ----
-if not hasattr(st.session_state, "_firebase_initialized"):
-    cred_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS", "serviceAccountKey.json")
-    cred = credentials.Certificate(cred_path)
-    initialize_app(cred)
-    st.session_state._firebase_initialized = True
-db = firestore.client()
-
-# ---- GOOGLE VISION SETUP ----
-gcv_client = vision.ImageAnnotatorClient()
-
-# ---- WHISPER SETUP ----
-@st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("base")
-whisper_model = load_whisper_model()
+# ---- SHARED CLIENTS ----
+# Cloudinary, Firestore and Whisper are set up once per process in app/clients.py
+# (shared with the Flask API), not on every script rerun. Whisper loads on first use.
+from app.clients import configure_cloudinary, get_db, get_whisper_model
+configure_cloudinary()
+db = get_db()
 
+from app.parsing import VOICE_AMOUNT_RE, parse_amount
 from ai.categorizer import category_ui, suggest_categories
+from ocr.photo_ocr import extract_text_from_image
 
 # ---- UTILITY FUNCTIONS ----
 def get_user_id():
@@ -50,24 +32,62 @@ def get_user_id():
 def save_to_firestore(user_id, collection, data):
     """Save a data dictionary to a given Firestore subcollection for a user."""
     db.collection("users").document(user_id).collection(collection).add(data)
+    if collection == "expenses":
+        # New expense: drop cached pages/records so it shows up right away
+        fetch_expense_page.clear()
+        fetch_expense_records.clear()
+
+# Expense queries are cached briefly so widget interactions don't refetch from Firestore
+EXPENSE_PAGE_SIZE = 50
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_expense_page(user_id, after_id=None, page_size=EXPENSE_PAGE_SIZE):
+    """Fetch one page of a user's expenses, newest first. Returns (rows, id of the last doc)."""
+    expenses = db.collection("users").document(user_id).collection("expenses")
+    query = expenses.select(["timestamp", "category", "amount", "note"]).order_by(
+        "timestamp", direction=firestore.Query.DESCENDING
+    ).limit(page_size)
+    if after_id:
+        cursor = expenses.document(after_id).get()
+        if not cursor.exists:
+            # Cursor expense was deleted; an empty page ends paging in View Expenses
+            return [], None
+        query = query.start_after(cursor)
+    rows, last_id = [], None
+    for doc in query.stream():
+        d = doc.to_dict()
+        rows.append([
+            d.get("timestamp"), d.get("category"), d.get("amount"), d.get("note", "")
+        ])
+        last_id = doc.id
+    return rows, last_id
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_expense_records(user_id):
+    """Fetch (timestamp, category, amount) for all of a user's expenses."""
+    docs = db.collection("users").document(user_id).collection("expenses").select(
+        ["timestamp", "category", "amount"]
+    ).stream()
+    return [(d.get("timestamp"), d.get("category"), d.get("amount")) for d in (doc.to_dict() for doc in docs)]
+
+# Uploads above this size are sent in chunks
+CLOUDINARY_LARGE_UPLOAD_BYTES = 10 * 1024 * 1024
 
 def upload_image_to_cloudinary(img_bytes, filename):
     """Upload image bytes to Cloudinary and return the public URL."""
-    result = cloudinary.uploader.upload(img_bytes, public_id=f'uploads/{get_user_id()}/{filename}')
+    upload = cloudinary.uploader.upload_large if len(img_bytes) > CLOUDINARY_LARGE_UPLOAD_BYTES else cloudinary.uploader.upload
+    # resource_type is explicit so Cloudinary doesn't have to auto-detect it
+    result = upload(io.BytesIO(img_bytes), public_id=f'uploads/{get_user_id()}/{filename}', resource_type="image")
     return result['secure_url']
 
 def ocr_image(image_bytes):
     """Extract text from image using Google Cloud Vision OCR."""
-    from ocr.photo_ocr import extract_text_from_image
     return extract_text_from_image(image_bytes)
 
 def transcribe_audio(audio_bytes):
-    """Transcribe audio bytes using Whisper."""
-    with open("temp.wav", "wb") as f:
-        f.write(audio_bytes)
-    result = whisper_model.transcribe("temp.wav", fp16=False)
-    os.remove("temp.wav")
-    return result["text"]
+    """Transcribe audio bytes using Whisper (decoded in memory, greedy decoding)."""
+    segments, _ = get_whisper_model().transcribe(io.BytesIO(audio_bytes), beam_size=1)
+    return "".join(segment.text for segment in segments)
 
 def show_avatar():
     """Display Budgetlytic logo/avatar at the top."""
@@ -78,6 +98,13 @@ def get_current_time():
     tz = pytz.timezone('Asia/Kolkata')
     return datetime.now(tz).strftime("%Y-%m-%d %H:%M")
 
+def get_month(timestamp):
+    """Return the "YYYY-MM" month of a timestamp written by get_current_time, or None if unparseable."""
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%d %H:%M").strftime("%Y-%m")
+    except (TypeError, ValueError):
+        return None
+
 # ---- MAIN APP LOGIC ----
 
 st.set_page_config(page_title="Budgetlytic", page_icon=":moneybag:", layout="centered")
@@ -94,6 +121,8 @@ if menu == "Upload Bill":
     if uploaded_img is not None:
         image_bytes = uploaded_img.read()
         st.image(image_bytes, caption="Uploaded Bill", width=350)
+        # OCR runs as soon as the file is uploaded, in the foreground: its text is needed right away
+        # for the category suggestions below, so there is nothing to move to the background
         ocr_text = ocr_image(image_bytes)
         st.subheader("Extracted Text")
         st.code(ocr_text)
@@ -126,8 +155,8 @@ elif menu == "Voice Expense":
         st.code(transcript)
         st.markdown("#### AI-based Category Suggestion")
         voice_category = category_ui(transcript)
-        amt = re.findall(r"\b\d{2,6}\b", transcript)
-        extracted_amt = float(amt[0]) if amt else None
+        amt = VOICE_AMOUNT_RE.search(transcript)
+        extracted_amt = float(amt.group()) if amt else None
         amount_voice = st.number_input("Amount (from voice or enter manually)", min_value=1.0, step=1.0, value=extracted_amt or 1.0)
         if not voice_category:
             voice_category = st.selectbox("Or choose manually", [
@@ -147,32 +176,42 @@ elif menu == "Voice Expense":
 
 elif menu == "View Expenses":
     st.header("Expense History")
-    docs = db.collection("users").document(get_user_id()).collection("expenses").order_by(
-        "timestamp", direction=firestore.Query.DESCENDING
-    ).stream()
-    rows = []
-    for doc in docs:
-        d = doc.to_dict()
-        rows.append([
-            d.get("timestamp"), d.get("category"), d.get("amount"), d.get("note", "")
-        ])
+    # Pages of EXPENSE_PAGE_SIZE rows; "Load more" fetches the next one after the last doc
+    pages = st.session_state.setdefault("expense_pages", 1)
+    rows, after_id, has_more = [], None, True
+    for _ in range(pages):
+        page_rows, after_id = fetch_expense_page(get_user_id(), after_id)
+        rows.extend(page_rows)
+        if len(page_rows) < EXPENSE_PAGE_SIZE:
+            has_more = False
+            break
     if rows:
         st.table(rows)
+        if has_more:
+            # Callbacks run before the rerun the click triggers, so the next page shows at once
+            st.button("Load more", on_click=lambda: st.session_state.update(expense_pages=pages + 1))
     else:
         st.info("No expenses found!")
 
 elif menu == "Insights":
     st.header("Spending Insights (Beta)")
-    docs = db.collection("users").document(get_user_id()).collection("expenses").stream()
-    import pandas as pd
-    df = pd.DataFrame([doc.to_dict() for doc in docs])
-    if not df.empty:
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
+    records = fetch_expense_records(get_user_id())
+    # Single streaming pass; only the small per-category/per-month totals become chart data
+    cat_sum, month_sum = Counter(), Counter()
+    for timestamp, category, amount in records:
+        amount = parse_amount(amount)
+        if amount is None:
+            continue
+        if category is not None:
+            cat_sum[category] += amount
+        month = get_month(timestamp)
+        if month:
+            month_sum[month] += amount
+    if records:
         st.subheader("Category-wise Spending")
-        st.bar_chart(df.groupby("category")["amount"].sum())
+        st.bar_chart(pd.Series(dict(sorted(cat_sum.items())), dtype=float))
         st.subheader("Monthly Spending")
-        df["month"] = pd.to_datetime(df["timestamp"]).dt.to_period("M").astype(str)
-        st.line_chart(df.groupby("month")["amount"].sum())
+        st.line_chart(pd.Series(dict(sorted(month_sum.items())), dtype=float))
     else:
         st.info("No expenses data for insights!")
 
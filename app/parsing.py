@@ -0,0 +1,20 @@
+"""
+parsing.py
+
+Value parsing shared by the Streamlit app (app/main.py) and the Flask API (app/routes.py).
+"""
+
+import math
+import re
+
+# Amount spoken in a voice note (first 2-6 digit number)
+VOICE_AMOUNT_RE = re.compile(r"\b\d{2,6}\b")
+
+
+def parse_amount(value):
+    """Convert a stored amount to float, or None if it is missing or not numeric."""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(amount) else amount
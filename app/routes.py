@@ -1,28 +1,28 @@
 from flask import Blueprint, request, jsonify
-from firebase_admin import credentials, firestore, initialize_app
-import whisper
-from google.cloud import vision
-import cloudinary
+from firebase_admin import firestore
 import cloudinary.uploader
-import os
 import io
+import re
+from collections import Counter
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 
-# ---- CLOUDINARY SETUP ----
-cloudinary.config(
-    cloud_name=os.environ.get("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.environ.get("CLOUDINARY_API_KEY"),
-    api_secret=os.environ.get("CLOUDINARY_API_SECRET")
-)
+from app.clients import configure_cloudinary, get_db, get_whisper_model
+from app.parsing import VOICE_AMOUNT_RE, parse_amount
+from ocr.photo_ocr import extract_text_from_image
 
-# ---- FIRESTORE SETUP ----
-# (Assumes firebase_admin.initialize_app() is called in your main app startup!)
-db = firestore.client()
-gcv_client = vision.ImageAnnotatorClient()
+# ---- SHARED CLIENTS ----
+# Same process-wide Cloudinary config, Firestore client and Whisper model as the Streamlit app
+configure_cloudinary()
+db = get_db()
 
-# Whisper model (load once)
-whisper_model = whisper.load_model("base")
+# Voice category pattern (compiled once): first category word; the amount uses VOICE_AMOUNT_RE
+VOICE_CATEGORY_RE = re.compile(r"\b(food|transport|bill|shopping|entertainment|medical|lunch|dinner|breakfast)\b", re.I)
+
+# Shared pool for overlapping independent network calls within a request (Cloudinary, Vision).
+# Requests themselves overlap when served by a threaded server, e.g. gunicorn -k gthread --threads 16.
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=16)
 
 # Initialize Flask blueprint
 routes = Blueprint('routes', __name__)
@@ -62,16 +62,16 @@ def upload_bill():
     user_id = request.form.get('user_id', 'anonymous')
     filename = file.filename
     img_bytes = file.read()
-    # Upload to Cloudinary
-    result = cloudinary.uploader.upload(
+    # Upload to Cloudinary and OCR with Google Vision are independent, so run them concurrently
+    upload_future = IO_EXECUTOR.submit(
+        cloudinary.uploader.upload,
         io.BytesIO(img_bytes),
         public_id=f'uploads/{user_id}/{filename}',
         resource_type="image"
     )
-    public_url = result.get("secure_url")
-    # OCR with Google Vision
-    from ocr.photo_ocr import extract_text_from_image
-    ocr_text = extract_text_from_image(img_bytes)
+    ocr_future = IO_EXECUTOR.submit(extract_text_from_image, img_bytes)
+    public_url = upload_future.result().get("secure_url")
+    ocr_text = ocr_future.result()
     # Store in Firestore
     data = {
         "img_url": public_url,
@@ -92,23 +92,16 @@ def voice_expense():
     file = request.files['file']
     user_id = request.form.get('user_id', 'anonymous')
     audio_bytes = file.read()
-    # Save temp audio file for Whisper
-    temp_audio_path = "temp.wav"
-    with open(temp_audio_path, "wb") as f:
-        f.write(audio_bytes)
-    result = whisper_model.transcribe(temp_audio_path, fp16=False)
-    os.remove(temp_audio_path)
-    transcript = result["text"]
+    # Decoded in memory, so concurrent requests don't share a temp file
+    segments, _ = get_whisper_model().transcribe(io.BytesIO(audio_bytes), beam_size=1)
+    transcript = "".join(segment.text for segment in segments)
     # Simple parsing for amount and category
-    import re
-    amt = re.findall(r"\b\d{2,6}\b", transcript)
-    cat = None
-    for c in ["food", "transport", "bill", "shopping", "entertainment", "medical", "other", "lunch", "dinner", "breakfast"]:
-        if c in transcript.lower():
-            cat = c.title()
+    amt = VOICE_AMOUNT_RE.search(transcript)
+    cat_m = VOICE_CATEGORY_RE.search(transcript)
+    cat = cat_m.group(1).title() if cat_m else None
     expense = {
         "category": cat or "Other",
-        "amount": float(amt[0]) if amt else 0.0,
+        "amount": float(amt.group()) if amt else 0.0,
         "note": transcript,
         "timestamp": get_current_time(),
         "type": "voice"
@@ -120,10 +113,33 @@ def voice_expense():
 @routes.route('/expenses/<user_id>', methods=['GET'])
 def get_expenses(user_id):
     """
-    Returns all expenses for the given user.
+    Returns expenses for the given user, newest first.
+    Optional query params for pagination: limit (page size) and
+    start_after (id of the last expense on the previous page).
     """
-    docs = db.collection("users").document(user_id).collection("expenses").order_by("timestamp", direction=firestore.Query.DESCENDING).stream()
-    expenses = [doc.to_dict() for doc in docs]
+    collection = db.collection("users").document(user_id).collection("expenses")
+    query = collection.order_by("timestamp", direction=firestore.Query.DESCENDING)
+    limit_arg = request.args.get("limit")
+    if limit_arg is not None:
+        # Parsed here rather than with type=int, which turns "abc" or "1.5" into no limit at all
+        try:
+            limit = int(limit_arg)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        query = query.limit(limit)
+    start_after = request.args.get("start_after")
+    if start_after:
+        snap = collection.document(start_after).get()
+        if not snap.exists:
+            return jsonify({"error": f"start_after expense '{start_after}' not found"}), 400
+        query = query.start_after(snap)
+    expenses = []
+    for doc in query.stream():
+        expense = doc.to_dict()
+        expense["id"] = doc.id
+        expenses.append(expense)
     return jsonify(expenses), 200
 
 # --------- API: Get Insights ---------
@@ -132,16 +148,24 @@ def get_insights(user_id):
     """
     Returns summary stats for a user's expenses.
     """
-    docs = db.collection("users").document(user_id).collection("expenses").stream()
-    import pandas as pd
-    df = pd.DataFrame([doc.to_dict() for doc in docs])
-    if not df.empty:
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
-        cat_sum = df.groupby("category")["amount"].sum().sort_values(ascending=False).to_dict()
-        total_spent = df["amount"].sum()
-        num_expenses = len(df)
+    # Only the fields the summary needs
+    docs = db.collection("users").document(user_id).collection("expenses").select(["category", "amount"]).stream()
+    # Aggregate while streaming instead of building a DataFrame
+    cat_sum = Counter()
+    total_spent = 0.0
+    num_expenses = 0
+    for doc in docs:
+        d = doc.to_dict()
+        num_expenses += 1
+        amount = parse_amount(d.get("amount"))
+        if amount is None:
+            continue
+        total_spent += amount
+        if d.get("category") is not None:
+            cat_sum[d["category"]] += amount
+    if num_expenses:
         insights = {
-            "categorywise": cat_sum,
+            "categorywise": dict(cat_sum.most_common()),
             "total_spent": total_spent,
             "num_expenses": num_expenses
         }
@@ -6,26 +6,73 @@ Note:
 - Requires your own Google Cloud Vision API key and compliance with its terms.
 - No stored images or data are used outside your app’s intended user workflow.
 
-This module provides a function to extract text from an image using the Google Cloud Vision API.
+This module provides functions to extract text from images using the Google Cloud Vision API.
 """
 
+import threading
 from google.cloud import vision
 
-def extract_text_from_image(image_bytes):
+# Vision allows up to 16 images per batch_annotate_images request
+MAX_IMAGES_PER_BATCH = 16
+
+_CLIENT_LOCK = threading.Lock()
+_CLIENT = None
+
+def get_client():
+    """
+    Return the shared Google Cloud Vision client, creating it on first use.
+
+    Returns:
+        vision.ImageAnnotatorClient: Client reused across all OCR calls.
+    """
+    global _CLIENT
+    # Locked like app.clients, so concurrent first requests don't each build a client
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            # Creating a Google Cloud Vision client (assumes GOOGLE_APPLICATION_CREDENTIALS is set)
+            _CLIENT = vision.ImageAnnotatorClient()
+        return _CLIENT
+
+def extract_text_from_image(image_bytes, client=None):
     """
     Extract text from image bytes using Google Cloud Vision OCR.
 
     Args:
         image_bytes (bytes): The image file content in bytes (e.g., from file.read()).
+        client (vision.ImageAnnotatorClient, optional): Client to use; defaults to the shared client.
 
     Returns:
         str: The extracted text as a string, or an empty string if nothing detected.
     """
-    # Creating a Google Cloud Vision client (assumes GOOGLE_APPLICATION_CREDENTIALS is set)
-    client = vision.ImageAnnotatorClient()
+    if client is None:
+        client = get_client()
     image = vision.Image(content=image_bytes)
     response = client.text_detection(image=image)
     texts = response.text_annotations
     if texts:
         return texts[0].description
-    return ""
\ No newline at end of file
+    return ""
+
+def extract_text_from_images(images_bytes_list, client=None):
+    """
+    Extract text from several images, sending up to 16 images per Vision API round trip.
+
+    Args:
+        images_bytes_list (list[bytes]): The image file contents in bytes.
+        client (vision.ImageAnnotatorClient, optional): Client to use; defaults to the shared client.
+
+    Returns:
+        list[str]: The extracted text for each image, in input order ("" where nothing was detected).
+    """
+    if client is None:
+        client = get_client()
+    feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+    texts = []
+    for i in range(0, len(images_bytes_list), MAX_IMAGES_PER_BATCH):
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=image_bytes), features=[feature])
+            for image_bytes in images_bytes_list[i:i + MAX_IMAGES_PER_BATCH]
+        ]
+        response = client.batch_annotate_images(requests=requests)
+        texts.extend(r.text_annotations[0].description if r.text_annotations else "" for r in response.responses)
+    return texts
\ No newline at end of file